@@ -1,8 +1,10 @@
+from optparse import make_option
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.core.urlresolvers import set_script_prefix
-from django_medusa.renderers import StaticSiteRenderer
+from django_medusa.renderers import BaseStaticSiteRenderer, StaticSiteRenderer
 from django_medusa.utils import get_static_renderers
+from django_medusa.workqueue import WorkQueue, PENDING, DONE, FAILED
 
 
 class Command(BaseCommand):
@@ -11,7 +13,51 @@ class Command(BaseCommand):
     help = 'Looks for \'renderers.py\' in each INSTALLED_APP, which defines '\
            'a class for processing one or more URL paths into static files.'
 
+    option_list = BaseCommand.option_list + (
+        make_option('--queue',
+            dest='queue',
+            default=None,
+            help='SQLite file recording the state of each path, so that an '
+                 'interrupted run can be resumed. Defaults to the '
+                 'MEDUSA_WORK_QUEUE setting.'),
+        make_option('--resume',
+            action='store_true',
+            dest='resume',
+            default=False,
+            help='Only generate the paths not yet generated by a previous '
+                 'run.'),
+        make_option('--retry-failed',
+            action='store_true',
+            dest='retry_failed',
+            default=False,
+            help='Only generate the paths that failed in a previous run.'),
+    )
+
     def handle(self, *args, **options):
+        queue_path = (options.get('queue') or
+                      getattr(settings, 'MEDUSA_WORK_QUEUE', None))
+        resume = options.get('resume')
+        retry_failed = options.get('retry_failed')
+
+        queue = None
+        if queue_path:
+            todo_states = []
+            if resume:
+                todo_states.append(PENDING)
+            if retry_failed:
+                todo_states.append(FAILED)
+
+            if todo_states:
+                queue = WorkQueue(queue_path, todo_states)
+            else:
+                queue = WorkQueue(queue_path)
+                queue.reset()
+
+        elif resume or retry_failed:
+            raise CommandError("--resume and --retry-failed require --queue "
+                               "or the MEDUSA_WORK_QUEUE setting.")
+
+        BaseStaticSiteRenderer.work_queue = queue
         StaticSiteRenderer.initialize_output()
 
         renderers = [Renderer() for Renderer in get_static_renderers()]
@@ -28,4 +74,19 @@ class Command(BaseCommand):
         for renderer in renderers:
             renderer.generate()
 
+        if queue is not None:
+            logger = StaticSiteRenderer.logger
+            failed = queue.get_failed()
+            logger.info("%s paths generated, %s failed",
+                        queue.count(DONE), len(failed))
+            for renderer_key, path, error in failed:
+                logger.error("Failed: %s (%s)", path, renderer_key)
+            if failed:
+                logger.error("Re-run with --retry-failed to regenerate the "
+                             "failed paths.")
+
         StaticSiteRenderer.finalize_output()
+
+        if queue is not None:
+            queue.close()
+            BaseStaticSiteRenderer.work_queue = None
@@ -1,7 +1,5 @@
 from __future__ import print_function
 from django.conf import settings
-from django.test.client import Client
-from ..log import get_logger
 from .base import BaseStaticSiteRenderer
 import os
 
@@ -11,26 +9,44 @@ STANDARD_EXTENSIONS = (
     'htm', 'html', 'css', 'xml', 'json', 'js', 'yaml', 'txt'
 )
 
-# Unfortunately split out from the class at the moment to allow rendering with
-# several processes via `multiprocessing`.
-# TODO: re-implement within the class if possible?
+
+def _write_if_changed(outpath, content):
+    """
+    Write `content` to `outpath` unless the file already holds exactly that
+    content, so unchanged files keep their mtime and `appcfg.py update` does
+    not upload them again. Returns whether the file was written.
+    """
+    try:
+        if os.path.getsize(outpath) == len(content):
+            with open(outpath, 'rb') as f:
+                if f.read() == content:
+                    return False
+    except (IOError, OSError):
+        pass
+
+    with open(outpath, 'wb') as f:
+        f.write(content)
+    return True
 
 
 class GAEStaticSiteRenderer(BaseStaticSiteRenderer):
     """
-    A variation of BaseStaticSiteRenderer that deploys directly to S3
-    rather than to the local filesystem.
+    A variation of BaseStaticSiteRenderer that writes the site into a
+    Google App Engine application (an `app.yaml` and a `deploy` directory
+    of static files), ready for `appcfg.py update`.
 
     Settings:
       * GAE_APP_ID
       * MEDUSA_DEPLOY_DIR
     """
+    def __init__(self):
+        super(GAEStaticSiteRenderer, self).__init__()
+        self.DEPLOY_DIR = settings.MEDUSA_DEPLOY_DIR
+
     def render_path(self, path=None, view=None):
         if not path:
             return None
 
-        DEPLOY_DIR = settings.MEDUSA_DEPLOY_DIR
-
         resp = self._render(path)
 
         # Force get_outpath to always use index.html by passing text/html
@@ -45,10 +61,10 @@ class GAEStaticSiteRenderer(BaseStaticSiteRenderer):
         except OSError:
             pass
 
-        self.logger.info("Saving file to %s", outpath)
-
-        with open(outpath, 'w') as f:
-            f.write(resp.content)
+        if _write_if_changed(outpath, resp.content):
+            self.logger.info("Saving file to %s", outpath)
+        else:
+            self.logger.info("Skipping unchanged file %s", outpath)
 
         mimetype = resp['Content-Type'].split(';', 1)[0]
 
@@ -70,33 +86,29 @@ class GAEStaticSiteRenderer(BaseStaticSiteRenderer):
     @classmethod
     def initialize_output(cls):
         super(GAEStaticSiteRenderer, cls).initialize_output()
-        cls.logger.info("Initializing output directory with `app.yaml`")
+        cls.logger.info("Initializing output directory")
 
-        # Initialize the MEDUSA_DEPLOY_DIR with an `app.yaml` and `deploy`
-        # directory which stores the static files on disk.
-        DEPLOY_DIR = settings.MEDUSA_DEPLOY_DIR
+        # Initialize the MEDUSA_DEPLOY_DIR with a `deploy` directory which
+        # stores the static files on disk. `app.yaml` is written once all
+        # the handlers are known, in finalize_output.
         static_output_dir = os.path.abspath(os.path.join(
-            DEPLOY_DIR,
+            settings.MEDUSA_DEPLOY_DIR,
             "deploy"
         ))
-        app_yaml = os.path.abspath(os.path.join(
-            DEPLOY_DIR,
-            "app.yaml"
-        ))
         if not os.path.exists(static_output_dir):
             os.makedirs(static_output_dir)
 
-        # Initialize the app.yaml file
-        app_yaml_f = open(app_yaml, 'w')
-        app_yaml_f.write(
-            "application: %s\n"\
-            "version: 1\n"\
-            "runtime: python\n"\
-            "api_version: 1\n"\
-            "threadsafe: true\n\n"\
-            "handlers:\n\n" % settings.GAE_APP_ID
-        )
-        app_yaml_f.close()
+        # Handlers collected from every renderer instance, in the order they
+        # were first seen.
+        GAEStaticSiteRenderer.handlers = []
+        GAEStaticSiteRenderer.seen_handlers = set()
+
+    @classmethod
+    def add_handler(cls, handler_def):
+        if (handler_def is not None and
+                handler_def not in GAEStaticSiteRenderer.seen_handlers):
+            GAEStaticSiteRenderer.seen_handlers.add(handler_def)
+            GAEStaticSiteRenderer.handlers.append(handler_def)
 
     @classmethod
     def finalize_output(cls):
@@ -108,25 +120,33 @@ class GAEStaticSiteRenderer(BaseStaticSiteRenderer):
             "app.yaml"
         ))
 
-        app_yaml_f = open(app_yaml, 'a')
+        app_yaml_parts = [
+            "application: %s\n"\
+            "version: 1\n"\
+            "runtime: python\n"\
+            "api_version: 1\n"\
+            "threadsafe: true\n\n"\
+            "handlers:\n\n" % settings.GAE_APP_ID
+        ]
+        app_yaml_parts += GAEStaticSiteRenderer.handlers
 
         # Handle "root" index.html pages up to 10 paths deep.
         # This is pretty awful, but it's an easy way to handle arbitrary
         # paths and a) ensure GAE uploads all the files we want and b)
         # we don't encounter the 100 URL definition limit for app.yaml.
-        app_yaml_f.write(
+        app_yaml_parts.append(
             "####################\n"\
             "# map index.html files to their root (up to 10 deep)\n"\
             "####################\n\n"
         )
 
-        for num_bits in xrange(10):
+        for num_bits in range(10):
             path_parts = "(.*)/" * num_bits
             counter_part = ""
-            for c in xrange(0, num_bits):
+            for c in range(0, num_bits):
                 counter_part += "\\%s/" % (c + 1)
 
-            app_yaml_f.write(
+            app_yaml_parts.append(
                 "- url: /%s\n"\
                 "  static_files: deploy/%sindex.html\n"\
                 "  upload: deploy/%sindex.html\n\n" % (
@@ -134,34 +154,32 @@ class GAEStaticSiteRenderer(BaseStaticSiteRenderer):
             ))
 
         # Anything else not matched should just be uploaded as-is.
-        app_yaml_f.write(
+        app_yaml_parts.append(
             "####################\n"\
             "# everything else\n"\
             "####################\n\n"\
             "- url: /\n"\
             "  static_dir: deploy"
         )
-        app_yaml_f.close()
+
+        if _write_if_changed(app_yaml,
+                             "".join(app_yaml_parts).encode('utf-8')):
+            cls.logger.info("Saving file to %s", app_yaml)
+        else:
+            cls.logger.info("Skipping unchanged file %s", app_yaml)
 
         cls.logger.info("You should now be able to deploy this to "
                         "Google App Engine by performing the following "
                         "command:\n"
                         "appcfg.py update %s", os.path.abspath(DEPLOY_DIR))
 
+        GAEStaticSiteRenderer.handlers = []
+        GAEStaticSiteRenderer.seen_handlers = set()
+
         super(GAEStaticSiteRenderer, cls).finalize_output()
 
     def generate(self):
-        DEPLOY_DIR = settings.MEDUSA_DEPLOY_DIR
-
-        handlers = super(GAEStaticSiteRenderer, self).generate()
-
-        DEPLOY_DIR = settings.MEDUSA_DEPLOY_DIR
-        app_yaml = os.path.abspath(os.path.join(
-            DEPLOY_DIR,
-            "app.yaml"
-        ))
-        app_yaml_f = open(app_yaml, 'a')
-        for handler_def in handlers:
-            if handler_def is not None:
-                app_yaml_f.write(handler_def)
-        app_yaml_f.close()
+        # Handlers stream back from the worker processes as each path is
+        # rendered; there is no need to hold on to the full list of results.
+        for handler_def in self.iter_generate():
+            self.add_handler(handler_def)
@@ -4,6 +4,7 @@ from django.test.client import Client
 from django_medusa.log import get_logger, finalize_logger
 import mimetypes
 import os
+import traceback
 
 __all__ = ['COMMON_MIME_MAPS', 'BaseStaticSiteRenderer']
 
@@ -34,6 +35,11 @@ class BaseStaticSiteRenderer(object):
     into static files on the filesystem by getting the view's response
     through the Django testclient.
     """
+    # Optional django_medusa.workqueue.WorkQueue, set by the management
+    # command. Stored on BaseStaticSiteRenderer like `logger` so that every
+    # renderer (and every worker process) shares it.
+    work_queue = None
+
     def __init__(self):
         self.client = None
 
@@ -113,27 +119,59 @@ class BaseStaticSiteRenderer(object):
     def render_path(self, path=None, view=None):
         raise NotImplementedError
 
-    def generate(self):
-        arglist = ((path, None) for path in self.paths)
+    def get_queue_key(self):
+        """ Identifies this renderer's paths in the work queue. """
+        cls = type(self)
+        return '%s.%s' % (cls.__module__, cls.__name__)
+
+    def iter_generate(self):
+        """
+        Render every path, yielding what `render_path` returned for each one
+        as soon as it is available (`None` for failed paths), so results can
+        be consumed while worker processes are still rendering.
+
+        With a work queue, the results of paths generated by earlier runs
+        are yielded first, followed by the paths still left to generate.
+        """
+        queue = self.work_queue
+
+        if queue is None:
+            paths = self.paths
+        else:
+            key = self.get_queue_key()
+            queue.add(key, self.paths)
+            paths = queue.get_todo(key, self.paths)
+            self.logger.info("%s: %s of %s paths left to generate",
+                             key, len(paths), len(self.paths))
+
+            # Include what was generated by earlier (interrupted) runs.
+            for retval in queue.get_results(key, self.paths):
+                yield retval
+
+        arglist = ((path, None) for path in paths)
 
         if getattr(settings, "MEDUSA_MULTITHREAD", False):
-            from multiprocessing import Pool, cpu_count, Queue
+            from multiprocessing import Pool, cpu_count
 
             generator = PageGenerator(self)
 
             self.logger.info("Generating with up to %s processes...",
                              cpu_count())
             pool = Pool(cpu_count())
-            retval = pool.map(generator, arglist, chunksize=1)
+            for retval in pool.imap(generator, arglist, chunksize=1):
+                yield retval
             pool.close()
+            pool.join()
 
         else:
             self.client = Client()
             generator = PageGenerator(self)
 
-            retval = map(generator, arglist)
+            for args in arglist:
+                yield generator(args)
 
-        return retval
+    def generate(self):
+        return list(self.iter_generate())
 
 
 class PageGenerator(object):
@@ -147,12 +185,20 @@ class PageGenerator(object):
     def __call__(self, args):
         path = args[0]
         logger = self.renderer.logger
+        queue = self.renderer.work_queue
 
         try:
             logger.info("Generating %s...", path)
             retval = self.renderer.render_path(*args)
             logger.info("Generated %s successfully", path)
-            return retval
 
         except:
             logger.error("Could not generate %s", path, exc_info=True)
+            if queue is not None:
+                queue.mark_failed(self.renderer.get_queue_key(), path,
+                                  traceback.format_exc())
+            return None
+
+        if queue is not None:
+            queue.mark_done(self.renderer.get_queue_key(), path, retval)
+        return retval
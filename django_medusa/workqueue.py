@@ -0,0 +1,146 @@
+from __future__ import print_function
+try:
+    import cPickle as pickle
+except ImportError:  # >=Python 3.
+    import pickle
+import os
+import sqlite3
+
+__all__ = ('WorkQueue', 'PENDING', 'DONE', 'FAILED')
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class WorkQueue(object):
+    """
+    A persistent, SQLite-backed record of every path a renderer has to
+    generate, along with whether it is still pending, was generated
+    successfully (and what `render_path` returned), or failed (and why).
+
+    Lets `staticsitegen` resume an interrupted run instead of starting again
+    from scratch.
+
+    `todo_states` is the set of states that still have to be (re)generated
+    in this run: `(PENDING, )` to resume, `(FAILED, )` to retry failures.
+
+    Each process opens its own connection, so the queue may be used from
+    `multiprocessing` workers as well as from the parent process.
+    """
+    def __init__(self, filename, todo_states=(PENDING, )):
+        self.filename = os.path.abspath(filename)
+        self.todo_states = tuple(todo_states)
+        self._conn = None
+        self._pid = None
+
+        with self.connection as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS medusa_paths ("
+                "  renderer TEXT NOT NULL,"
+                "  path TEXT NOT NULL,"
+                "  state TEXT NOT NULL,"
+                "  result BLOB,"
+                "  error TEXT,"
+                "  PRIMARY KEY (renderer, path)"
+                ")"
+            )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid'] = None
+        return state
+
+    @property
+    def connection(self):
+        """ A connection private to the current process. """
+        if self._conn is None or self._pid != os.getpid():
+            dirname = os.path.dirname(self.filename)
+            if not os.path.exists(dirname):
+                os.makedirs(dirname)
+
+            # Generous timeout: workers contend for the write lock.
+            self._conn = sqlite3.connect(self.filename, timeout=60)
+            self._pid = os.getpid()
+        return self._conn
+
+    def reset(self):
+        """ Forget everything recorded by a previous run. """
+        with self.connection as conn:
+            conn.execute("DELETE FROM medusa_paths")
+
+    def add(self, renderer, paths):
+        """
+        Record `paths` as pending for `renderer`. Paths that are already
+        known keep their current state.
+        """
+        with self.connection as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO medusa_paths (renderer, path, state) "
+                "VALUES (?, ?, ?)",
+                ((renderer, path, PENDING) for path in paths)
+            )
+
+    def get_todo(self, renderer, paths):
+        """
+        Return the subset of `paths` (in order) which is in one of
+        `todo_states` for `renderer`.
+        """
+        cursor = self.connection.execute(
+            "SELECT path FROM medusa_paths WHERE renderer = ? AND state IN "
+            "(%s)" % ", ".join("?" * len(self.todo_states)),
+            (renderer, ) + self.todo_states
+        )
+        todo = set(row[0] for row in cursor)
+        return [path for path in paths if path in todo]
+
+    def get_results(self, renderer, paths):
+        """
+        Return what `render_path` returned for each of `paths` (in order)
+        that has been generated successfully, including in earlier runs.
+        """
+        cursor = self.connection.execute(
+            "SELECT path, result FROM medusa_paths "
+            "WHERE renderer = ? AND state = ?",
+            (renderer, DONE)
+        )
+        results = dict((row[0], pickle.loads(bytes(row[1])))
+                       for row in cursor)
+        return [results[path] for path in paths if path in results]
+
+    def mark_done(self, renderer, path, result=None):
+        data = sqlite3.Binary(pickle.dumps(result, 2))
+        with self.connection as conn:
+            conn.execute(
+                "UPDATE medusa_paths SET state = ?, result = ?, error = NULL "
+                "WHERE renderer = ? AND path = ?",
+                (DONE, data, renderer, path)
+            )
+
+    def mark_failed(self, renderer, path, error):
+        with self.connection as conn:
+            conn.execute(
+                "UPDATE medusa_paths SET state = ?, result = NULL, error = ? "
+                "WHERE renderer = ? AND path = ?",
+                (FAILED, error, renderer, path)
+            )
+
+    def get_failed(self):
+        """ Return `(renderer, path, error)` for every failed path. """
+        return list(self.connection.execute(
+            "SELECT renderer, path, error FROM medusa_paths WHERE state = ? "
+            "ORDER BY renderer, path",
+            (FAILED, )
+        ))
+
+    def count(self, state):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM medusa_paths WHERE state = ?", (state, )
+        ).fetchone()[0]
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._pid = None